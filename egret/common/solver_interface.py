@@ -10,9 +10,50 @@
 """
 This file includes the solver interfaces for EGRET.
 """
+import logging
+
 from pyomo.opt import SolverFactory, TerminationCondition
+from pyomo.opt.base import OptSolver
 from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
 
+logger = logging.getLogger('egret.common.solver_interface')
+
+## above this many variables, symbolic solver labels make writing the
+## solver file dramatically slower and larger
+_SYMBOLIC_LABELS_WARNING_THRESHOLD = 10000
+
+## termination conditions which are acceptable
+_safe_termination_conditions = frozenset([
+                                TerminationCondition.maxTimeLimit,
+                                TerminationCondition.maxIterations,
+                                TerminationCondition.minFunctionValue,
+                                TerminationCondition.minStepLength,
+                                TerminationCondition.globallyOptimal,
+                                TerminationCondition.locallyOptimal,
+                                TerminationCondition.feasible,
+                                TerminationCondition.optimal,
+                                TerminationCondition.maxEvaluations,
+                                TerminationCondition.other,
+                               ])
+
+## cache of solver objects created from string names; repeated solves
+## (e.g., rolling-horizon runs) skip the SolverFactory plugin lookup and
+## executable probe. Solvers returned from this cache are owned by the
+## cache and have their options reset on each _solve_model call.
+_solver_cache = {}
+
+## mapping from solver family to the (mipgap, timelimit) option names it
+## understands; add an entry here to support a new solver
+_SOLVER_OPTION_KEYS = {
+    'gurobi': ('MIPGap', 'TimeLimit'),
+    'cplex': ('mip_tolerances_mipgap', 'timelimit'),
+    'glpk': ('mipgap', 'tmlim'),
+    'cbc': ('ratioGap', 'sec'),
+    'xpress': ('mipgap', 'maxtime'),
+    'scip': ('limits/gap', 'limits/time'),
+    'highs': ('mip_rel_gap', 'time_limit'),
+}
+
 
 def _set_options(solver, mipgap=None, timelimit=None, other_options=None):
     '''
@@ -40,26 +81,13 @@ def _set_options(solver, mipgap=None, timelimit=None, other_options=None):
 
     solver_name = solver.name
 
-    if 'gurobi' in solver_name:
-        if mipgap is not None:
-            solver.options.MIPGap = mipgap
-        if timelimit is not None:
-            solver.options.TimeLimit = timelimit
-    elif 'cplex' in solver_name:
-        if mipgap is not None:
-            solver.options.mip_tolerances_mipgap = mipgap
-        if timelimit is not None:
-            solver.options.timelimit = timelimit
-    elif 'glpk' in solver_name:
-        if mipgap is not None:
-            solver.options.mipgap = mipgap
-        if timelimit is not None:
-            solver.options.tmlim = timelimit
-    elif 'cbc' in solver_name:
-        if mipgap is not None:
-            solver.options.ratioGap = mipgap
-        if timelimit is not None:
-            solver.options.sec = timelimit
+    for family, (mipgap_key, timelimit_key) in _SOLVER_OPTION_KEYS.items():
+        if family in solver_name:
+            if mipgap is not None:
+                solver.options[mipgap_key] = mipgap
+            if timelimit is not None:
+                solver.options[timelimit_key] = timelimit
+            break
     # else:
     #     raise Exception('Solver {0} not recognized'.format(solver_name))
 
@@ -73,7 +101,8 @@ def _solve_model(model,
                  timelimit = None,
                  solver_tee = True,
                  symbolic_solver_labels = False,
-                 options = None):
+                 options = None,
+                 load_solutions = True):
     '''
     Create and solve an Egret power system optimization model
 
@@ -94,6 +123,19 @@ def _solve_model(model,
         Use symbolic solver labels. Useful for debugging; default is False.
     options : dict (optional)
         Other options to pass into the solver. Default is dict().
+    load_solutions : bool (optional)
+        Load the solution back into the pyomo model after the solve.
+        Default is True. Callers that only inspect the results object
+        (e.g., feasibility probes in iterative loops) can pass False to
+        skip the O(nvars) load; variable values must then be loaded
+        explicitly if needed later.
+
+    Notes
+    -----
+    If a PersistentSolver which is already bound to model is passed in
+    (e.g., from a previous call to _solve_model), set_instance is skipped
+    and the solver resolves incrementally rather than re-ingesting the
+    full model.
 
     Returns
     -------
@@ -102,37 +144,37 @@ def _solve_model(model,
 
     results = None
 
-    ## termination conditions which are acceptable
-    safe_termination_conditions = [
-                                   TerminationCondition.maxTimeLimit,
-                                   TerminationCondition.maxIterations,
-                                   TerminationCondition.minFunctionValue,
-                                   TerminationCondition.minStepLength,
-                                   TerminationCondition.globallyOptimal,
-                                   TerminationCondition.locallyOptimal,
-                                   TerminationCondition.feasible,
-                                   TerminationCondition.optimal,
-                                   TerminationCondition.maxEvaluations,
-                                   TerminationCondition.other,
-                                  ]
-
     if isinstance(solver, str):
-        solver = SolverFactory(solver)
-    elif isinstance(solver, pyomo.opt.base.OptSolver):
+        if solver not in _solver_cache:
+            _solver_cache[solver] = SolverFactory(solver)
+        solver = _solver_cache[solver]
+        ## reset any options set by a previous call
+        solver.options.clear()
+    elif isinstance(solver, OptSolver):
         pass
     else:
         raise Exception('solver must be string or an instanciated pyomo solver')
 
     _set_options(solver, mipgap, timelimit, options)
 
+    if symbolic_solver_labels and hasattr(model, 'nvariables') \
+            and model.nvariables() > _SYMBOLIC_LABELS_WARNING_THRESHOLD:
+        logger.warning('symbolic_solver_labels=True on a %d-variable model will '
+                       'dramatically slow writing the solver file; '
+                       'set False in production runs' % model.nvariables())
+
     if isinstance(solver, PersistentSolver):
-        solver.set_instance(model, symbolic_solver_labels=symbolic_solver_labels)
-        results = solver.solve(model, tee=solver_tee)
+        ## only pay for set_instance once per model; repeated calls
+        ## with the same bound solver/model pair resolve incrementally
+        if getattr(solver, '_pyomo_model', None) is not model:
+            solver.set_instance(model, symbolic_solver_labels=symbolic_solver_labels)
+        results = solver.solve(tee=solver_tee, load_solutions=load_solutions)
     else:
         results = solver.solve(model, tee=solver_tee, \
-                              symbolic_solver_labels=symbolic_solver_labels)
+                              symbolic_solver_labels=symbolic_solver_labels,
+                              load_solutions=load_solutions)
 
-    if results.solver.termination_condition not in safe_termination_conditions:
-        raise Exception('Problem encountered during solve, termination_condition {}'.format(results.solver.terminataion_condition))
+    if results.solver.termination_condition not in _safe_termination_conditions:
+        raise Exception('Problem encountered during solve, termination_condition {}'.format(results.solver.termination_condition))
 
     return model, results
\ No newline at end of file
@@ -14,10 +14,146 @@ modifying the data dictionary
 import egret.model_library.transmission.tx_calc as tx_calc
 from egret.model_library.defn import BasePointType, ApproximationType
 import numpy as np
+import scipy.sparse as sp
+
+## numba is an optional dependency; when available, the dense
+## nonzero-filter kernel below is JIT compiled into a single pass,
+## otherwise we fall back to the two-pass numpy version
+try:
+    from numba import njit
+
+    @njit(cache=True)
+    def _nonzero_row(row):
+        """
+        Return the column indices and values of the nonzero entries of a
+        dense 1-D array in a single pass.
+        """
+        idx = np.empty(row.size, np.int64)
+        val = np.empty(row.size, row.dtype)
+        k = 0
+        for i in range(row.size):
+            v = row[i]
+            if v != 0.:
+                idx[k] = i
+                val[k] = v
+                k += 1
+        return idx[:k], val[:k]
+except ImportError:
+    def _nonzero_row(row):
+        """
+        Return the column indices and values of the nonzero entries of a
+        dense 1-D array.
+        """
+        idx = np.flatnonzero(row)
+        return idx, row[idx]
+
+
+def _row_nonzero_dict(mat, idx, names):
+    """
+    Extract the nonzero entries of row idx of mat as a dict mapping
+    names to values; mat may be dense or any scipy.sparse matrix.
+    """
+    if sp.issparse(mat):
+        if not sp.isspmatrix_csr(mat):
+            mat = mat.tocsr()
+        ## slice the CSR arrays directly; getrow would materialize a
+        ## new sparse matrix per row
+        row_start = mat.indptr[idx]
+        row_end = mat.indptr[idx+1]
+        cols = mat.indices[row_start:row_end]
+        vals = mat.data[row_start:row_end]
+    else:
+        ## mat[idx] is a view into the row; filter it in one pass
+        cols, vals = _nonzero_row(np.ascontiguousarray(mat[idx]))
+    return dict(zip([names[j] for j in cols], vals.tolist()))
+
+
+class PTDFMatrix(object):
+    """
+    A read-only sensitivity matrix with branches as rows and buses as
+    columns. The matrix is stored CSR when it is sparse enough
+    (density below density_cutoff) and dense otherwise, so consumers
+    building constraints can iterate only the stored nonzeros instead
+    of walking per-branch dicts over every bus.
+    """
+    __slots__ = ('matrix', 'branch_names', 'bus_names',
+                 '_branch_name_to_idx', '_bus_name_to_idx', 'is_sparse')
+
+    def __init__(self, matrix, branch_names, bus_names, density_cutoff=0.3):
+        self.branch_names = tuple(branch_names)
+        self.bus_names = tuple(bus_names)
+        self._branch_name_to_idx = {name: i for i, name in enumerate(self.branch_names)}
+        self._bus_name_to_idx = {name: i for i, name in enumerate(self.bus_names)}
+
+        if sp.issparse(matrix):
+            self.matrix = matrix.tocsr()
+            self.is_sparse = True
+        else:
+            matrix = np.asarray(matrix)
+            density = np.count_nonzero(matrix) / matrix.size
+            if density < density_cutoff:
+                self.matrix = sp.csr_matrix(matrix)
+                self.is_sparse = True
+            else:
+                self.matrix = np.ascontiguousarray(matrix)
+                self.is_sparse = False
+
+    def __getitem__(self, key):
+        branch_name, bus_name = key
+        idx = self._branch_name_to_idx[branch_name]
+        jdx = self._bus_name_to_idx[bus_name]
+        return self.matrix[idx, jdx]
+
+    def get_row(self, branch_name):
+        """
+        Return the row for branch_name as a dict mapping bus names to
+        coefficients; for a sparse matrix only the nonzeros appear.
+        """
+        idx = self._branch_name_to_idx[branch_name]
+        if self.is_sparse:
+            return _row_nonzero_dict(self.matrix, idx, self.bus_names)
+        return dict(zip(self.bus_names, self.matrix[idx].tolist()))
+
+    def iter_row_nonzeros(self, branch_name):
+        """
+        Iterate the (bus_name, coefficient) nonzeros of the row for
+        branch_name.
+        """
+        idx = self._branch_name_to_idx[branch_name]
+        if self.is_sparse:
+            row_start = self.matrix.indptr[idx]
+            row_end = self.matrix.indptr[idx+1]
+            for jdx, val in zip(self.matrix.indices[row_start:row_end],
+                                self.matrix.data[row_start:row_end].tolist()):
+                yield self.bus_names[jdx], val
+        else:
+            row = self.matrix[idx]
+            for jdx in np.flatnonzero(row):
+                yield self.bus_names[jdx], row[jdx]
+
+
+def create_ptdf_matrix(md, base_point=BasePointType.FLATSTART):
+    """
+    Calculate the PTDF matrix for the network described by md and
+    return it as a PTDFMatrix, an alternative to create_dicts_of_ptdf
+    that does not store per-branch dicts on the model data.
+    """
+    branches = md.data['elements']['branch']
+    buses = md.data['elements']['bus']
+    branch_attrs = md.attributes(element_type='branch')
+    bus_attrs = md.attributes(element_type='bus')
+
+    reference_bus = md.data['system']['reference_bus']
+    ptdf = tx_calc.calculate_ptdf(branches,buses,branch_attrs['names'],bus_attrs['names'],reference_bus,base_point)
+
+    return PTDFMatrix(ptdf, branch_attrs['names'], bus_attrs['names'])
+
 
 def create_dicts_of_ptdf(md,base_point=BasePointType.FLATSTART):
-    branches = dict(md.elements(element_type='branch'))
-    buses = dict(md.elements(element_type='bus'))
+    ## the underlying element dicts can be used directly; rebuilding
+    ## them through md.elements() would traverse the data a second time
+    branches = md.data['elements']['branch']
+    buses = md.data['elements']['bus']
     branch_attrs = md.attributes(element_type='branch')
     bus_attrs = md.attributes(element_type='bus')
 
@@ -25,29 +161,30 @@ def create_dicts_of_ptdf(md,base_point=BasePointType.FLATSTART):
     ptdf = tx_calc.calculate_ptdf(branches,buses,branch_attrs['names'],bus_attrs['names'],reference_bus,base_point)
     phi_from, phi_to = tx_calc.calculate_phi_constant(branches,branch_attrs['names'],bus_attrs['names'],ApproximationType.PTDF)
 
-    _len_branch = len(branch_attrs['names'])
-    _mapping_branch = {i: branch_attrs['names'][i] for i in list(range(0,_len_branch))}
-
-    _len_bus = len(bus_attrs['names'])
-    _mapping_bus = {i: bus_attrs['names'][i] for i in list(range(0,_len_bus))}
+    ## freeze the key sequences once; tuples index faster than lists
+    ## and the same key layout is shared across every row dict
+    branch_names = tuple(branch_attrs['names'])
+    bus_names = tuple(bus_attrs['names'])
 
-    for idx,branch_name in _mapping_branch.items():
-        branch = md.data['elements']['branch'][branch_name]
-        _row_ptdf = {bus_attrs['names'][i]: ptdf[idx,i] for i in list(range(0,_len_bus))}
-        branch['ptdf'] = _row_ptdf
+    ## convert the whole matrix to Python floats in one C call instead
+    ## of boxing each row separately inside the loop
+    ptdf_list = ptdf.tolist()
 
-    for idx, bus_name in _mapping_bus.items():
-        bus = md.data['elements']['bus'][bus_name]
-        _row_phi_from = {branch_attrs['names'][i]: phi_from[idx, i] for i in list(range(0, _len_branch)) if phi_from[idx, i] != 0.}
-        bus['phi_from'] = _row_phi_from
+    for idx, branch_name in enumerate(branch_names):
+        branch = branches[branch_name]
+        branch['ptdf'] = dict(zip(bus_names, ptdf_list[idx]))
 
-        _row_phi_to = {branch_attrs['names'][i]: phi_to[idx, i] for i in list(range(0, _len_branch)) if phi_to[idx, i] != 0.}
-        bus['phi_to'] = _row_phi_to
+    for idx, bus_name in enumerate(bus_names):
+        bus = buses[bus_name]
+        bus['phi_from'] = _row_nonzero_dict(phi_from, idx, branch_names)
+        bus['phi_to'] = _row_nonzero_dict(phi_to, idx, branch_names)
 
 
 def create_dicts_of_ptdf_losses(md,base_point=BasePointType.SOLUTION):
-    branches = dict(md.elements(element_type='branch'))
-    buses = dict(md.elements(element_type='bus'))
+    ## the underlying element dicts can be used directly; rebuilding
+    ## them through md.elements() would traverse the data a second time
+    branches = md.data['elements']['branch']
+    buses = md.data['elements']['bus']
     branch_attrs = md.attributes(element_type='branch')
     bus_attrs = md.attributes(element_type='bus')
 
@@ -56,32 +193,26 @@ def create_dicts_of_ptdf_losses(md,base_point=BasePointType.SOLUTION):
     phi_from, phi_to = tx_calc.calculate_phi_constant(branches,branch_attrs['names'],bus_attrs['names'],ApproximationType.PTDF_LOSSES)
     phi_loss_from, phi_loss_to = tx_calc.calculate_phi_loss_constant(branches,branch_attrs['names'],bus_attrs['names'],ApproximationType.PTDF_LOSSES)
 
-    _len_branch = len(branch_attrs['names'])
-    _mapping_branch = {i: branch_attrs['names'][i] for i in list(range(0,_len_branch))}
-
-    _len_bus = len(bus_attrs['names'])
-    _mapping_bus = {i: bus_attrs['names'][i] for i in list(range(0,_len_bus))}
-
-    for idx,branch_name in _mapping_branch.items():
-        branch = md.data['elements']['branch'][branch_name]
-        _row_ptdf_r = {bus_attrs['names'][i]: ptdf_r[idx,i] for i in list(range(0,_len_bus))}
-        branch['ptdf_r'] = _row_ptdf_r
-
-        _row_ldf = {bus_attrs['names'][i]: ldf[idx,i] for i in list(range(0,_len_bus))}
-        branch['ldf'] = _row_ldf
-
-        branch['ldf_c'] = ldf_c[idx]
-
-    for idx, bus_name in _mapping_bus.items():
-        bus = md.data['elements']['bus'][bus_name]
-        _row_phi_from = {branch_attrs['names'][i]: phi_from[idx,i] for i in list(range(0,_len_branch)) if phi_from[idx, i] != 0.}
-        bus['phi_from'] = _row_phi_from
-
-        _row_phi_to = {branch_attrs['names'][i]: phi_to[idx,i] for i in list(range(0,_len_branch)) if phi_to[idx, i] != 0.}
-        bus['phi_to'] = _row_phi_to
-
-        _row_phi_loss_from = {branch_attrs['names'][i]: phi_loss_from[idx,i] for i in list(range(0,_len_branch)) if phi_loss_from[idx, i] != 0.}
-        bus['phi_loss_from'] = _row_phi_loss_from
-
-        _row_phi_loss_to = {branch_attrs['names'][i]: phi_loss_to[idx,i] for i in list(range(0,_len_branch)) if phi_loss_to[idx, i] != 0.}
-        bus['phi_loss_to'] = _row_phi_loss_to
+    ## freeze the key sequences once; tuples index faster than lists
+    ## and the same key layout is shared across every row dict
+    branch_names = tuple(branch_attrs['names'])
+    bus_names = tuple(bus_attrs['names'])
+
+    ## convert the whole matrices to Python floats in one C call instead
+    ## of boxing each row separately inside the loop
+    ptdf_r_list = ptdf_r.tolist()
+    ldf_list = ldf.tolist()
+    ldf_c_list = ldf_c.tolist()
+
+    for idx, branch_name in enumerate(branch_names):
+        branch = branches[branch_name]
+        branch['ptdf_r'] = dict(zip(bus_names, ptdf_r_list[idx]))
+        branch['ldf'] = dict(zip(bus_names, ldf_list[idx]))
+        branch['ldf_c'] = ldf_c_list[idx]
+
+    for idx, bus_name in enumerate(bus_names):
+        bus = buses[bus_name]
+        bus['phi_from'] = _row_nonzero_dict(phi_from, idx, branch_names)
+        bus['phi_to'] = _row_nonzero_dict(phi_to, idx, branch_names)
+        bus['phi_loss_from'] = _row_nonzero_dict(phi_loss_from, idx, branch_names)
+        bus['phi_loss_to'] = _row_nonzero_dict(phi_loss_to, idx, branch_names)
@@ -14,11 +14,12 @@ import pyomo.environ as pe
 
 def declare_var(varname, model, index_set, **kwargs):
     # if user provides bounds as dict of tuple, translate it
-    # into something that Pyomo understands
+    # into something that Pyomo understands; the callers (zip_items and
+    # the builders' comprehensions) already supply (lb, ub) pairs, so
+    # the rule is a single dict lookup per index (the default-arg
+    # capture avoids a closure cell dereference)
     if kwargs and 'bounds' in kwargs and isinstance(kwargs['bounds'], dict):
-        d = kwargs['bounds']
-        bounds_rule = lambda m, k: (d[k][0], d[k][1])
-        kwargs['bounds'] = bounds_rule
+        kwargs['bounds'] = lambda m, k, _d=kwargs['bounds']: _d[k]
 
     # create var if index set is None
     if index_set is None:
@@ -32,6 +33,15 @@ def declare_var(varname, model, index_set, **kwargs):
         model.add_component(varname, pe.Var(pyomo_index_set, **kwargs))
 
 def declare_set(setname, model, index_set, **kwargs):
+    # if an identical set was already declared on this model, reuse it
+    # rather than constructing (and attaching) a duplicate component
+    existing_set = model.component(setname)
+    if existing_set is not None:
+        # materialize index_set so the comparison does not exhaust it
+        index_set = list(index_set)
+        if list(existing_set) == index_set:
+            return existing_set
+
     # transform the index set into a Pyomo Set
     if 'ordered' not in kwargs:
         # add ordered=True if the user did not specify anything
@@ -18,6 +18,12 @@ import egret.model_library.decl as decl
 from egret.model_library.defn import FlowType, CoordinateType, ApproximationType, RelaxationType
 from egret.data.model_data import zip_items
 
+## LinearExpression moved between pyomo releases
+try:
+    from pyomo.core.expr.numeric_expr import LinearExpression
+except ImportError:
+    from pyomo.core.expr.current import LinearExpression
+
 
 def declare_var_dva(model, index_set, **kwargs):
     """
@@ -309,6 +315,15 @@ def declare_eq_branch_power_btheta_approx(model, index_set, branches, approximat
     con_set = decl.declare_set("_con_eq_branch_power_btheta_approx_set", model, index_set)
 
     m.eq_pf_branch = pe.Constraint(con_set)
+
+    ## hoist the component and dispatch lookups out of the loop; pyomo
+    ## resolves m.<component> through __getattr__ on every access
+    eq_pf_branch = m.eq_pf_branch
+    pf = m.pf
+    va = m.va
+    _btheta = approximation_type == ApproximationType.BTHETA
+    _btheta_losses = approximation_type == ApproximationType.BTHETA_LOSSES
+
     for branch_name in con_set:
         branch = branches[branch_name]
 
@@ -321,15 +336,15 @@ def declare_eq_branch_power_btheta_approx(model, index_set, branches, approximat
             tau = branch['transformer_tap_ratio']
             shift = math.radians(branch['transformer_phase_shift'])
 
-        if approximation_type == ApproximationType.BTHETA:
+        if _btheta:
             x = branch['reactance']
             b = -1/(tau*x)
-        elif approximation_type == ApproximationType.BTHETA_LOSSES:
+        elif _btheta_losses:
             b = tx_calc.calculate_susceptance(branch)/tau
 
-        m.eq_pf_branch[branch_name] = \
-            m.pf[branch_name] == \
-            b * (m.va[from_bus] - m.va[to_bus] + shift)
+        eq_pf_branch[branch_name] = \
+            pf[branch_name] == \
+            b * (va[from_bus] - va[to_bus] + shift)
 
 
 def declare_eq_branch_loss_btheta_approx(model, index_set, branches, relaxation_type = RelaxationType.NONE):
@@ -342,6 +357,20 @@ def declare_eq_branch_loss_btheta_approx(model, index_set, branches, relaxation_
     con_set = decl.declare_set("_con_eq_branch_loss_btheta_approx_set", model, index_set)
 
     m.eq_pfl_branch = pe.Constraint(con_set)
+
+    eq_pfl_branch = m.eq_pfl_branch
+    pfl = m.pfl
+    dva = m.dva
+
+    ## resolve the relaxation dispatch once rather than re-comparing
+    ## the enum on every branch
+    if relaxation_type == RelaxationType.NONE:
+        _emit = lambda lhs, rhs: lhs == rhs
+    elif relaxation_type == RelaxationType.SOC:
+        _emit = lambda lhs, rhs: lhs >= rhs
+    else:
+        return
+
     for branch_name in con_set:
         branch = branches[branch_name]
 
@@ -350,18 +379,34 @@ def declare_eq_branch_loss_btheta_approx(model, index_set, branches, relaxation_
             tau = branch['transformer_tap_ratio']
         g = tx_calc.calculate_conductance(branch)/tau
 
-        if relaxation_type == RelaxationType.NONE:
-            m.eq_pfl_branch[branch_name] = \
-                m.pfl[branch_name] == \
-                g * (m.dva[branch_name])**2
-        elif relaxation_type == RelaxationType.SOC:
-            m.eq_pfl_branch[branch_name] = \
-                m.pfl[branch_name] >= \
-                g * (m.dva[branch_name])**2
+        eq_pfl_branch[branch_name] = \
+            _emit(pfl[branch_name], g * (dva[branch_name])**2)
+
+
+def _truncate_sensitivity_row(row, rel_tol):
+    """
+    Keep the largest-magnitude entries of a sensitivity row such that
+    the retained L1 mass is at least (1 - rel_tol) of the row total,
+    dropping the long tail of small coefficients.
+    """
+    total = 0.
+    for coef in row.values():
+        total += abs(coef)
+    if total == 0.:
+        return row
+    keep_mass = (1. - rel_tol) * total
+    kept = {}
+    mass = 0.
+    for bus_name, coef in sorted(row.items(), key=lambda kv: abs(kv[1]), reverse=True):
+        kept[bus_name] = coef
+        mass += abs(coef)
+        if mass >= keep_mass:
+            break
+    return kept
 
 
 def declare_eq_branch_power_ptdf_approx(model, index_set, branches, buses, bus_p_loads, gens_by_bus,
-                                        bus_gs_fixed_shunts, ptdf_tol = 1e-10,
+                                        bus_gs_fixed_shunts, ptdf_tol = 1e-10, ptdf_rel_tol = None,
                                         approximation_type = ApproximationType.PTDF):
     """
     Create the equality constraints for power (from PTDF approximation)
@@ -372,9 +417,31 @@ def declare_eq_branch_power_ptdf_approx(model, index_set, branches, buses, bus_p
     con_set = decl.declare_set("_con_eq_branch_power_ptdf_approx_set", model, index_set)
 
     m.eq_pf_branch = pe.Constraint(con_set)
+
+    eq_pf_branch = m.eq_pf_branch
+    pf = m.pf
+    pl = m.pl
+    pg = m.pg
+
+    ## resolve the per-bus data the row loop needs once: the shunt
+    ## injection, the load variable (None when the bus is unloaded),
+    ## the generator variables, and the net phi constant. The row loop
+    ## otherwise repeats these name-keyed lookups for every branch.
+    bus_data = {}
+    for bus_name, bus in buses.items():
+        bus_data[bus_name] = (bus_gs_fixed_shunts[bus_name],
+                              pl[bus_name] if bus_p_loads[bus_name] != 0.0 else None,
+                              [pg[gen_name] for gen_name in gens_by_bus[bus_name]],
+                              sum(bus['phi_from'].values()) - sum(bus['phi_to'].values()))
+
     for branch_name in con_set:
         branch = branches[branch_name]
-        expr = 0
+        ## accumulate the row in flat coefficient/variable lists and
+        ## emit a single LinearExpression; summing term by term builds
+        ## and discards a new expression node per PTDF entry
+        constant = 0.
+        linear_coefs = []
+        linear_vars = []
 
         tau = 1.0
         shift = 0.0
@@ -386,40 +453,41 @@ def declare_eq_branch_power_ptdf_approx(model, index_set, branches, buses, bus_p
             ptdf = branch['ptdf']
             if shift != 0.:
                 b = -(1 / branch['reactance'])
-                expr += b * (shift / tau)
+                constant += b * (shift / tau)
         elif approximation_type == ApproximationType.PTDF_LOSSES:
             ptdf = branch['ptdf_r']
             if shift != 0.:
                 b = tx_calc.calculate_susceptance(branch)
-                expr += b * (shift / tau)
+                constant += b * (shift / tau)
+
+        if ptdf_rel_tol:
+            ptdf = _truncate_sensitivity_row(ptdf, ptdf_rel_tol)
 
         for bus_name, coef in ptdf.items():
             if ptdf_tol and abs(coef) < ptdf_tol:
                 continue
-            bus = buses[bus_name]
-            phi_from = bus['phi_from']
-            phi_to = bus['phi_to']
+            gs, pl_var, bus_pg_vars, phi_net = bus_data[bus_name]
 
-            if bus_gs_fixed_shunts[bus_name] != 0.0:
-                expr += coef * bus_gs_fixed_shunts[bus_name]
+            if gs != 0.0:
+                constant += coef * gs
 
-            if bus_p_loads[bus_name] != 0.0:
-                expr += coef * m.pl[bus_name]
+            if pl_var is not None:
+                linear_coefs.append(coef)
+                linear_vars.append(pl_var)
 
-            for gen_name in gens_by_bus[bus_name]:
-                expr -= coef * m.pg[gen_name]
+            for pg_var in bus_pg_vars:
+                linear_coefs.append(-coef)
+                linear_vars.append(pg_var)
 
-            for _, phi in phi_from.items():
-                expr += coef * phi
+            constant += coef * phi_net
 
-            for _, phi in phi_to.items():
-                expr -= coef * phi
-
-        m.eq_pf_branch[branch_name] = \
-            m.pf[branch_name] == expr
+        eq_pf_branch[branch_name] = \
+            pf[branch_name] == LinearExpression(constant=constant,
+                                                  linear_coefs=linear_coefs,
+                                                  linear_vars=linear_vars)
 
 
-def declare_eq_branch_loss_ptdf_approx(model, index_set, branches, buses, bus_p_loads, gens_by_bus, bus_gs_fixed_shunts, ldf_tol = 1e-10):
+def declare_eq_branch_loss_ptdf_approx(model, index_set, branches, buses, bus_p_loads, gens_by_bus, bus_gs_fixed_shunts, ldf_tol = 1e-10, ldf_rel_tol = None):
     """
     Create the equality constraints for losses (from PTDF approximation)
     in the branch
@@ -429,43 +497,172 @@ def declare_eq_branch_loss_ptdf_approx(model, index_set, branches, buses, bus_p_
     con_set = decl.declare_set("_con_eq_branch_loss_ptdf_approx_set", model, index_set)
 
     m.eq_pfl_branch = pe.Constraint(con_set)
+
+    eq_pfl_branch = m.eq_pfl_branch
+    pfl = m.pfl
+    pl = m.pl
+    pg = m.pg
+
+    ## per-bus data resolved once; see declare_eq_branch_power_ptdf_approx
+    bus_data = {}
+    for bus_name, bus in buses.items():
+        bus_data[bus_name] = (bus_gs_fixed_shunts[bus_name],
+                              pl[bus_name] if bus_p_loads[bus_name] != 0.0 else None,
+                              [pg[gen_name] for gen_name in gens_by_bus[bus_name]],
+                              sum(bus['phi_loss_from'].values()) - sum(bus['phi_loss_to'].values()))
+
     for branch_name in con_set:
         branch = branches[branch_name]
-        expr = 0
+        ## as in declare_eq_branch_power_ptdf_approx, build the row in
+        ## flat lists and emit a single LinearExpression
+        constant = branch['ldf_c']
+        linear_coefs = []
+        linear_vars = []
 
         if branch['branch_type'] == 'transformer':
             tau = branch['transformer_tap_ratio']
             shift = math.radians(branch['transformer_phase_shift'])
             g = tx_calc.calculate_conductance(branch)
-            expr += (g/tau) * shift**2
+            constant += (g/tau) * shift**2
 
         ldf = branch['ldf']
+        if ldf_rel_tol:
+            ldf = _truncate_sensitivity_row(ldf, ldf_rel_tol)
         for bus_name, coef in ldf.items():
             if ldf_tol and abs(coef) < ldf_tol:
                 continue
-            bus = buses[bus_name]
-            phi_loss_from = bus['phi_loss_from']
-            phi_loss_to = bus['phi_loss_to']
+            gs, pl_var, bus_pg_vars, phi_loss_net = bus_data[bus_name]
+
+            if gs != 0.0:
+                constant += coef * gs
 
-            if bus_gs_fixed_shunts[bus_name] != 0.0:
-                expr += coef * bus_gs_fixed_shunts[bus_name]
+            if pl_var is not None:
+                linear_coefs.append(coef)
+                linear_vars.append(pl_var)
 
-            if bus_p_loads[bus_name] != 0.0:
-                expr += coef * m.pl[bus_name]
+            for pg_var in bus_pg_vars:
+                linear_coefs.append(-coef)
+                linear_vars.append(pg_var)
 
-            for gen_name in gens_by_bus[bus_name]:
-                expr -= coef * m.pg[gen_name]
+            constant += coef * phi_loss_net
 
-            for _, phi_loss in phi_loss_from.items():
-                expr += coef * phi_loss
+        eq_pfl_branch[branch_name] = \
+            pfl[branch_name] == LinearExpression(constant=constant,
+                                                   linear_coefs=linear_coefs,
+                                                   linear_vars=linear_vars)
 
-            for _, phi_loss in phi_loss_to.items():
-                expr -= coef * phi_loss
 
-        expr += branch['ldf_c']
+def declare_eq_branch_power_loss_ptdf_approx(model, index_set, branches, buses, bus_p_loads,
+                                             gens_by_bus, bus_gs_fixed_shunts,
+                                             ptdf_tol = 1e-10, ldf_tol = 1e-10,
+                                             ptdf_rel_tol = None, ldf_rel_tol = None):
+    """
+    Create the equality constraints for power and losses (from PTDF
+    approximation) in the branch in a single pass over the branches,
+    equivalent to calling declare_eq_branch_power_ptdf_approx with
+    ApproximationType.PTDF_LOSSES followed by
+    declare_eq_branch_loss_ptdf_approx, but sharing the per-bus
+    shunt/load/generator lookups between the two rows.
+    """
+    m = model
+
+    con_set = decl.declare_set("_con_eq_branch_power_ptdf_approx_set", model, index_set)
+    loss_con_set = decl.declare_set("_con_eq_branch_loss_ptdf_approx_set", model, index_set)
+
+    m.eq_pf_branch = pe.Constraint(con_set)
+    m.eq_pfl_branch = pe.Constraint(loss_con_set)
+
+    eq_pf_branch = m.eq_pf_branch
+    eq_pfl_branch = m.eq_pfl_branch
+    pf = m.pf
+    pfl = m.pfl
+    pl = m.pl
+    pg = m.pg
+
+    ## per-bus data resolved once; see declare_eq_branch_power_ptdf_approx
+    bus_data = {}
+    for bus_name, bus in buses.items():
+        bus_data[bus_name] = (bus_gs_fixed_shunts[bus_name],
+                              pl[bus_name] if bus_p_loads[bus_name] != 0.0 else None,
+                              [pg[gen_name] for gen_name in gens_by_bus[bus_name]],
+                              sum(bus['phi_from'].values()) - sum(bus['phi_to'].values()),
+                              sum(bus['phi_loss_from'].values()) - sum(bus['phi_loss_to'].values()))
+
+    for branch_name in con_set:
+        branch = branches[branch_name]
+
+        pf_constant = 0.
+        pf_coefs = []
+        pf_vars = []
+        pfl_constant = branch['ldf_c']
+        pfl_coefs = []
+        pfl_vars = []
+
+        tau = 1.0
+        shift = 0.0
+        if branch['branch_type'] == 'transformer':
+            tau = branch['transformer_tap_ratio']
+            shift = math.radians(branch['transformer_phase_shift'])
+            g = tx_calc.calculate_conductance(branch)
+            pfl_constant += (g/tau) * shift**2
+            if shift != 0.:
+                b = tx_calc.calculate_susceptance(branch)
+                pf_constant += b * (shift / tau)
+
+        ptdf = branch['ptdf_r']
+        ldf = branch['ldf']
+        if ptdf_rel_tol:
+            ptdf = _truncate_sensitivity_row(ptdf, ptdf_rel_tol)
+        if ldf_rel_tol:
+            ldf = _truncate_sensitivity_row(ldf, ldf_rel_tol)
+
+        if ptdf.keys() == ldf.keys():
+            row_bus_names = ptdf.keys()
+        else:
+            row_bus_names = ptdf.keys() | ldf.keys()
+
+        for bus_name in row_bus_names:
+            coef = ptdf.get(bus_name, 0.)
+            if ptdf_tol and abs(coef) < ptdf_tol:
+                coef = 0.
+            coef_l = ldf.get(bus_name, 0.)
+            if ldf_tol and abs(coef_l) < ldf_tol:
+                coef_l = 0.
+            if coef == 0. and coef_l == 0.:
+                continue
 
-        m.eq_pfl_branch[branch_name] = \
-            m.pfl[branch_name] == expr
+            gs, pl_var, bus_pg_vars, phi_net, phi_loss_net = bus_data[bus_name]
+
+            if coef != 0.:
+                if gs != 0.0:
+                    pf_constant += coef * gs
+                if pl_var is not None:
+                    pf_coefs.append(coef)
+                    pf_vars.append(pl_var)
+                for pg_var in bus_pg_vars:
+                    pf_coefs.append(-coef)
+                    pf_vars.append(pg_var)
+                pf_constant += coef * phi_net
+
+            if coef_l != 0.:
+                if gs != 0.0:
+                    pfl_constant += coef_l * gs
+                if pl_var is not None:
+                    pfl_coefs.append(coef_l)
+                    pfl_vars.append(pl_var)
+                for pg_var in bus_pg_vars:
+                    pfl_coefs.append(-coef_l)
+                    pfl_vars.append(pg_var)
+                pfl_constant += coef_l * phi_loss_net
+
+        eq_pf_branch[branch_name] = \
+            pf[branch_name] == LinearExpression(constant=pf_constant,
+                                                linear_coefs=pf_coefs,
+                                                linear_vars=pf_vars)
+        eq_pfl_branch[branch_name] = \
+            pfl[branch_name] == LinearExpression(constant=pfl_constant,
+                                                 linear_coefs=pfl_coefs,
+                                                 linear_vars=pfl_vars)
 
 
 def declare_ineq_s_branch_thermal_limit(model, index_set,
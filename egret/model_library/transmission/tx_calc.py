@@ -13,6 +13,8 @@ different computations for transmission models
 """
 import math
 import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
 from math import cos, sin
 from egret.model_library.defn import BasePointType, ApproximationType
 
@@ -271,19 +273,124 @@ def calculate_va_from_vj_vr(vj, vr):
     return None
 
 
+def calculate_y_matrix_vectorized(branches, branch_names):
+    """
+    Compute the y matrix entries of :py:meth:`calculate_y_matrix` for
+    every branch at once. The branch properties are stacked into NumPy
+    arrays ordered as branch_names, and the returned dict has the same
+    keys as calculate_y_matrix but maps to arrays over the branches.
+    """
+    _len_branch = len(branch_names)
+    rs = np.empty(_len_branch)
+    xs = np.empty(_len_branch)
+    bc = np.empty(_len_branch)
+    tau = np.ones(_len_branch)
+    shift = np.zeros(_len_branch)
+    for i, branch_name in enumerate(branch_names):
+        branch = branches[branch_name]
+        rs[i] = branch['resistance']
+        xs[i] = branch['reactance']
+        bc[i] = branch['charging_susceptance']
+        if branch['branch_type'] == 'transformer':
+            tau[i] = branch['transformer_tap_ratio']
+            shift[i] = branch['transformer_phase_shift']
+
+    bc = bc/2
+    tr = tau * np.cos(np.radians(shift))
+    tj = tau * np.sin(np.radians(shift))
+    mag = rs**2 + xs**2
+    tau2 = tau**2
+
+    a = rs/(tau2*mag)                    # c1
+    b = (xs/mag - bc)/tau2               # c2
+    c = (-rs*tr - xs*tj)/(tau2*mag)      # c3
+    d = (rs*tj - xs*tr)/(tau2*mag)       # c4
+    i = (xs*tj - rs*tr)/(tau2*mag)       # c7
+    j = (-rs*tj - xs*tr)/(tau2*mag)      # c8
+    k = rs/mag                           # c5
+    l = xs/mag - bc                      # c6
+
+    y_dict = {}
+    y_dict[('ifr', 'vfr')] = a
+    y_dict[('ifr', 'vfj')] = b
+    y_dict[('ifr', 'vtr')] = c
+    y_dict[('ifr', 'vtj')] = d
+
+    y_dict[('ifj', 'vfr')] = -b
+    y_dict[('ifj', 'vfj')] = a
+    y_dict[('ifj', 'vtr')] = -d
+    y_dict[('ifj', 'vtj')] = c
+
+    y_dict[('itr', 'vfr')] = i
+    y_dict[('itr', 'vfj')] = j
+    y_dict[('itr', 'vtr')] = k
+    y_dict[('itr', 'vtj')] = l
+
+    y_dict[('itj', 'vfr')] = -j
+    y_dict[('itj', 'vfj')] = i
+    y_dict[('itj', 'vtr')] = -l
+    y_dict[('itj', 'vtj')] = k
+
+    return y_dict
+
+
+def calculate_pf_init(branches, branch_attrs, bus_attrs):
+    """
+    Compute the initial real power flow in the "from" end of every
+    branch from the bus voltage initialization, returning a dict keyed
+    by branch name. This is the vectorized equivalent of calling
+    calculate_y_matrix_from_branch/calculate_ifr/calculate_ifj/
+    calculate_p once per branch.
+    """
+    bus_names = bus_attrs['names']
+    _len_bus = len(bus_names)
+    _bus_name_to_idx = {bus_name: i for i, bus_name in enumerate(bus_names)}
+
+    vm = np.fromiter((bus_attrs['vm'][b] for b in bus_names), float, count=_len_bus)
+    va = np.fromiter((bus_attrs['va'][b] for b in bus_names), float, count=_len_bus)
+    vr = vm * np.cos(va)
+    vj = vm * np.sin(va)
+
+    branch_names = branch_attrs['names']
+    _len_branch = len(branch_names)
+    from_idx = np.empty(_len_branch, dtype=np.int64)
+    to_idx = np.empty(_len_branch, dtype=np.int64)
+    for i, branch_name in enumerate(branch_names):
+        branch = branches[branch_name]
+        from_idx[i] = _bus_name_to_idx[branch['from_bus']]
+        to_idx[i] = _bus_name_to_idx[branch['to_bus']]
+
+    ## the "from" rows of the branch admittance
+    y_matrix = calculate_y_matrix_vectorized(branches, branch_names)
+    a = y_matrix['ifr', 'vfr']
+    b = y_matrix['ifr', 'vfj']
+    c = y_matrix['ifr', 'vtr']
+    d = y_matrix['ifr', 'vtj']
+
+    vfr = vr[from_idx]
+    vfj = vj[from_idx]
+    vtr = vr[to_idx]
+    vtj = vj[to_idx]
+
+    ifr = a*vfr + b*vfj + c*vtr + d*vtj
+    ifj = -b*vfr + a*vfj - d*vtr + c*vtj
+    pf = vfr*ifr + vfj*ifj
+
+    return dict(zip(branch_names, pf.tolist()))
+
+
 def _calculate_J11(branches,buses,index_set_branch,index_set_bus,base_point=BasePointType.FLATSTART,approximation_type=ApproximationType.PTDF):
     """
     Compute the power flow Jacobian for partial derivative of real power flow to voltage angle
     """
     _len_bus = len(index_set_bus)
-    _mapping_bus = {i: index_set_bus[i] for i in list(range(0,_len_bus))}
+    _bus_name_to_idx = {bus_name: i for i, bus_name in enumerate(index_set_bus)}
 
     _len_branch = len(index_set_branch)
-    _mapping_branch = {i: index_set_branch[i] for i in list(range(0,_len_branch))}
 
     J11 = np.zeros((_len_branch,_len_bus))
 
-    for idx_row, branch_name in _mapping_branch.items():
+    for idx_row, branch_name in enumerate(index_set_branch):
         branch = branches[branch_name]
         from_bus = branch['from_bus']
         to_bus = branch['to_bus']
@@ -309,11 +416,9 @@ def _calculate_J11(branches,buses,index_set_branch,index_set_bus,base_point=Base
             tn = buses[from_bus]['va']
             tm = buses[to_bus]['va']
 
-        idx_col = [key for key, value in _mapping_bus.items() if value == from_bus][0]
-        J11[idx_row][idx_col] = -b * vn * vm * cos(tn - tm)
-
-        idx_col = [key for key, value in _mapping_bus.items() if value == to_bus][0]
-        J11[idx_row][idx_col] = b * vn * vm * cos(tn - tm)
+        val = b * vn * vm * cos(tn - tm)
+        J11[idx_row][_bus_name_to_idx[from_bus]] = -val
+        J11[idx_row][_bus_name_to_idx[to_bus]] = val
 
     return J11
 
@@ -323,14 +428,13 @@ def _calculate_L11(branches,buses,index_set_branch,index_set_bus,base_point=Base
     Compute the power flow Jacobian for partial derivative of real power losses to voltage angle
     """
     _len_bus = len(index_set_bus)
-    _mapping_bus = {i: index_set_bus[i] for i in list(range(0,_len_bus))}
+    _bus_name_to_idx = {bus_name: i for i, bus_name in enumerate(index_set_bus)}
 
     _len_branch = len(index_set_branch)
-    _mapping_branch = {i: index_set_branch[i] for i in list(range(0,_len_branch))}
 
     L11 = np.zeros((_len_branch,_len_bus))
 
-    for idx_row, branch_name in _mapping_branch.items():
+    for idx_row, branch_name in enumerate(index_set_branch):
         branch = branches[branch_name]
         from_bus = branch['from_bus']
         to_bus = branch['to_bus']
@@ -351,11 +455,9 @@ def _calculate_L11(branches,buses,index_set_branch,index_set_bus,base_point=Base
             tn = buses[from_bus]['va']
             tm = buses[to_bus]['va']
 
-        idx_col = [key for key, value in _mapping_bus.items() if value == from_bus][0]
-        L11[idx_row][idx_col] = 2 * g * vn * vm * sin(tn - tm)
-
-        idx_col = [key for key, value in _mapping_bus.items() if value == to_bus][0]
-        L11[idx_row][idx_col] = -2 * g * vn * vm * sin(tn - tm)
+        val = 2 * g * vn * vm * sin(tn - tm)
+        L11[idx_row][_bus_name_to_idx[from_bus]] = val
+        L11[idx_row][_bus_name_to_idx[to_bus]] = -val
 
     return L11
 
@@ -363,17 +465,22 @@ def _calculate_L11(branches,buses,index_set_branch,index_set_bus,base_point=Base
 def calculate_phi_constant(branches,index_set_branch,index_set_bus,approximation_type=ApproximationType.PTDF):
     """
     Compute the phase shifter constant for fixed phase shift transformers
+
+    Returns a pair of scipy.sparse.csr_matrix objects of shape
+    (len(index_set_bus), len(index_set_branch)); only the fixed phase
+    shift transformers contribute nonzeros.
     """
     _len_bus = len(index_set_bus)
-    _mapping_bus = {i: index_set_bus[i] for i in list(range(0,_len_bus))}
+    _bus_name_to_idx = {bus_name: i for i, bus_name in enumerate(index_set_bus)}
 
     _len_branch = len(index_set_branch)
-    _mapping_branch = {i: index_set_branch[i] for i in list(range(0,_len_branch))}
 
-    phi_from = np.zeros((_len_bus,_len_branch))
-    phi_to = np.zeros((_len_bus,_len_branch))
+    _rows_from = list()
+    _rows_to = list()
+    _cols = list()
+    _data = list()
 
-    for idx_row, branch_name in _mapping_branch.items():
+    for idx_col, branch_name in enumerate(index_set_branch):
         branch = branches[branch_name]
         from_bus = branch['from_bus']
         to_bus = branch['to_bus']
@@ -391,11 +498,14 @@ def calculate_phi_constant(branches,index_set_branch,index_set_bus,approximation
         elif approximation_type == ApproximationType.PTDF_LOSSES:
             b = calculate_susceptance(branch)*(shift/tau)
 
-        idx_col = [key for key, value in _mapping_bus.items() if value == from_bus][0]
-        phi_from[idx_col][idx_row] = b
+        if b != 0.:
+            _rows_from.append(_bus_name_to_idx[from_bus])
+            _rows_to.append(_bus_name_to_idx[to_bus])
+            _cols.append(idx_col)
+            _data.append(b)
 
-        idx_col = [key for key, value in _mapping_bus.items() if value == to_bus][0]
-        phi_to[idx_col][idx_row] = b
+    phi_from = sp.coo_matrix((_data, (_rows_from, _cols)), shape=(_len_bus,_len_branch)).tocsr()
+    phi_to = sp.coo_matrix((_data, (_rows_to, _cols)), shape=(_len_bus,_len_branch)).tocsr()
 
     return phi_from, phi_to
 
@@ -403,17 +513,22 @@ def calculate_phi_constant(branches,index_set_branch,index_set_bus,approximation
 def calculate_phi_loss_constant(branches,index_set_branch,index_set_bus,approximation_type=ApproximationType.PTDF_LOSSES):
     """
     Compute the phase shifter constant for fixed phase shift transformers
+
+    Returns a pair of scipy.sparse.csr_matrix objects of shape
+    (len(index_set_bus), len(index_set_branch)); only the fixed phase
+    shift transformers contribute nonzeros.
     """
     _len_bus = len(index_set_bus)
-    _mapping_bus = {i: index_set_bus[i] for i in list(range(0,_len_bus))}
+    _bus_name_to_idx = {bus_name: i for i, bus_name in enumerate(index_set_bus)}
 
     _len_branch = len(index_set_branch)
-    _mapping_branch = {i: index_set_branch[i] for i in list(range(0,_len_branch))}
 
-    phi_loss_from = np.zeros((_len_bus,_len_branch))
-    phi_loss_to = np.zeros((_len_bus,_len_branch))
+    _rows_from = list()
+    _rows_to = list()
+    _cols = list()
+    _data = list()
 
-    for idx_row, branch_name in _mapping_branch.items():
+    for idx_col, branch_name in enumerate(index_set_branch):
         branch = branches[branch_name]
         from_bus = branch['from_bus']
         to_bus = branch['to_bus']
@@ -431,11 +546,14 @@ def calculate_phi_loss_constant(branches,index_set_branch,index_set_bus,approxim
         elif approximation_type == ApproximationType.PTDF_LOSSES:
             g = calculate_conductance(branch)*(1/tau)*shift**2
 
-        idx_col = [key for key, value in _mapping_bus.items() if value == from_bus][0]
-        phi_loss_from[idx_col][idx_row] = g
+        if g != 0.:
+            _rows_from.append(_bus_name_to_idx[from_bus])
+            _rows_to.append(_bus_name_to_idx[to_bus])
+            _cols.append(idx_col)
+            _data.append(g)
 
-        idx_col = [key for key, value in _mapping_bus.items() if value == to_bus][0]
-        phi_loss_to[idx_col][idx_row] = g
+    phi_loss_from = sp.coo_matrix((_data, (_rows_from, _cols)), shape=(_len_bus,_len_branch)).tocsr()
+    phi_loss_to = sp.coo_matrix((_data, (_rows_to, _cols)), shape=(_len_bus,_len_branch)).tocsr()
 
     return phi_loss_from, phi_loss_to
 
@@ -524,18 +642,28 @@ def _calculate_pfl_constant(branches,buses,index_set_branch,base_point=BasePoint
 
     return pfl_constant
 
+def _calculate_sensitivity(J0):
+    """
+    Solve the reduced system J0 for the angle sensitivity matrix by
+    sparse LU factorization, falling back to the pseudo-inverse when
+    the factorization detects a singular system. Factoring and back-
+    solving against the identity is much faster than forming a dense
+    inverse for the mostly-empty network matrices seen here.
+    """
+    try:
+        return splu(sp.csc_matrix(J0)).solve(np.identity(J0.shape[0]))
+    except RuntimeError:
+        print("Matrix not invertible. Calculating pseudo-inverse instead.")
+        return np.linalg.pinv(J0,rcond=1e-7)
+
+
 def calculate_ptdf(branches,buses,index_set_branch,index_set_bus,reference_bus,base_point=BasePointType.FLATSTART):
     """
     Calculates the sensitivity of the voltage angle to real power injections
     """
 
     _len_bus = len(index_set_bus)
-    _mapping_bus = {i: index_set_bus[i] for i in list(range(0,_len_bus))}
-
-    _len_branch = len(index_set_branch)
-    _mapping_branch = {i: index_set_branch[i] for i in list(range(0,_len_branch))}
-
-    _ref_bus_idx = [key for key, value in _mapping_bus.items() if value == reference_bus][0]
+    _ref_bus_idx = index_set_bus.index(reference_bus)
 
     J = _calculate_J11(branches,buses,index_set_branch,index_set_bus,base_point,approximation_type=ApproximationType.PTDF)
     A = calculate_adjacency_matrix(branches,index_set_branch,index_set_bus)
@@ -546,12 +674,7 @@ def calculate_ptdf(branches,buses,index_set_branch,index_set_bus,reference_bus,b
     J0[-1][_ref_bus_idx] = 1
     J0[_ref_bus_idx][-1] = 1
 
-    try:
-        SENSI = np.linalg.inv(J0)
-    except np.linalg.LinAlgError:
-        print("Matrix not invertible. Calculating pseudo-inverse instead.")
-        SENSI = np.linalg.pinv(J0,rcond=1e-7)
-        pass
+    SENSI = _calculate_sensitivity(J0)
     SENSI = SENSI[:-1,:-1]
 
     PTDF = np.matmul(J,SENSI)
@@ -566,12 +689,7 @@ def calculate_ptdf_ldf(branches,buses,index_set_branch,index_set_bus,reference_b
     """
 
     _len_bus = len(index_set_bus)
-    _mapping_bus = {i: index_set_bus[i] for i in list(range(0,_len_bus))}
-
-    _len_branch = len(index_set_branch)
-    _mapping_branch = {i: index_set_branch[i] for i in list(range(0,_len_branch))}
-
-    _ref_bus_idx = [key for key, value in _mapping_bus.items() if value == reference_bus][0]
+    _ref_bus_idx = index_set_bus.index(reference_bus)
 
     J = _calculate_J11(branches,buses,index_set_branch,index_set_bus,base_point,approximation_type=ApproximationType.PTDF_LOSSES)
     L = _calculate_L11(branches,buses,index_set_branch,index_set_bus,base_point)
@@ -589,12 +707,7 @@ def calculate_ptdf_ldf(branches,buses,index_set_branch,index_set_bus,reference_b
     J0[-1][_ref_bus_idx] = 1
     J0[_ref_bus_idx][-1] = 1
 
-    try:
-        SENSI = np.linalg.inv(J0)
-    except np.linalg.LinAlgError:
-        print("Matrix not invertible. Calculating pseudo-inverse instead.")
-        SENSI = np.linalg.pinv(J0,rcond=1e-7)
-        pass
+    SENSI = _calculate_sensitivity(J0)
     SENSI = SENSI[:-1,:-1]
 
     PTDF = np.matmul(J, SENSI)
@@ -614,23 +727,17 @@ def calculate_adjacency_matrix(branches,index_set_branch,index_set_bus):
     for a given branch
     """
     _len_bus = len(index_set_bus)
-    _mapping_bus = {i: index_set_bus[i] for i in list(range(0,_len_bus))}
+    _bus_name_to_idx = {bus_name: i for i, bus_name in enumerate(index_set_bus)}
 
     _len_branch = len(index_set_branch)
-    _mapping_branch = {i: index_set_branch[i] for i in list(range(0,_len_branch))}
 
     adjacency_matrix = np.zeros((_len_branch,_len_bus))
 
-    for idx_row, branch_name in _mapping_branch.items():
+    for idx_row, branch_name in enumerate(index_set_branch):
         branch = branches[branch_name]
 
-        from_bus = branch['from_bus']
-        idx_col = [key for key, value in _mapping_bus.items() if value == from_bus][0]
-        adjacency_matrix[idx_row,idx_col] = -1
-
-        to_bus = branch['to_bus']
-        idx_col = [key for key, value in _mapping_bus.items() if value == to_bus][0]
-        adjacency_matrix[idx_row,idx_col] = 1
+        adjacency_matrix[idx_row,_bus_name_to_idx[branch['from_bus']]] = -1
+        adjacency_matrix[idx_row,_bus_name_to_idx[branch['to_bus']]] = 1
 
     return adjacency_matrix
 
@@ -22,18 +22,29 @@ def add_model_attr(attr, requires = {}):
         def wrapper(*args, **kwds):
             ## tag this function in the model with the appropriate attribute
             model = args[0]
-            if hasattr(model, attr):
-                raise Exception("Exception adding %s! Model already has %s %s! You may only add one type of %s!"%(func.__name__, attr, getattr(model,attr), attr)) 
+            ## keep a plain set of the egret tags on the model; checking
+            ## it avoids hasattr, which scans the pyomo component maps
+            egret_attrs = getattr(model, '_egret_attrs', None)
+            if egret_attrs is None:
+                egret_attrs = set()
+                model._egret_attrs = egret_attrs
+            if attr in egret_attrs:
+                raise Exception("Exception adding %s! Model already has %s %s! You may only add one type of %s!"%(func.__name__, attr, getattr(model,attr), attr))
             # this checks to see if the required components were already added
             for base_attr in requires:
-                if not hasattr(model, base_attr):
-                    raise Exception("Exception adding %s! %s requires some %s to be added first!"%(func.__name__, func.__name__, base_attr)) 
+                if base_attr not in egret_attrs:
+                    if not hasattr(model, base_attr):
+                        raise Exception("Exception adding %s! %s requires some %s to be added first!"%(func.__name__, func.__name__, base_attr))
+                    ## memoize so later builders requiring the same base
+                    ## skip the component scan
+                    egret_attrs.add(base_attr)
                 ## None in this context means there is no specific requirement
                 if requires[base_attr] is None:
                     continue
                 if getattr(model, base_attr) not in requires[base_attr]:
                     raise Exception("Exception adding %s! %s requires one of: "%(func.__name__, func.__name__) + ", ".join(requires[base_attr]) + ", to be added first.")
             setattr(model, attr, func.__name__)
+            egret_attrs.add(attr)
             return func(*args, **kwds)
         return wrapper
     return actual_decorator
@@ -42,32 +53,56 @@ def add_model_attr(attr, requires = {}):
 ## is handy for building pyomo params
 def build_uc_time_mapping(md_timeperiods):
     ## Assums the last key is time
+
+    ## map the (1-based) pyomo time index directly to the model data
+    ## timestamp, absorbing the -1 offset once instead of per lookup
+    _tp_by_pmt = {i+1: ts for i, ts in enumerate(md_timeperiods)}
+
     def uc_time_helper(_data):
         ## if there is no data,
         ## we return None to the initializer
         if _data is None:
             return None
+
+        ## specialize the initializer based on the shape of _data once,
+        ## here, rather than re-discovering it on every Param index
+
+        ## _data is itself a time series; only the time key matters
+        if isinstance(_data, dict) and _data.get('data_type') == 'time_series':
+            def init_rule(m, *key, _values=_data['values']):
+                return _values[_tp_by_pmt[key[-1]]]
+            return init_rule
+
+        ## _data is a constant shared by every key and time
+        if not isinstance(_data, dict):
+            def init_rule(m, *key):
+                return _data
+            return init_rule
+
+        ## _data maps element keys to time series or constants; split
+        ## the two so the per-call path is a dict lookup each
+        _ts_values = {}
+        _constants = {}
+        for _key, att in _data.items():
+            if isinstance(att, dict):
+                if att.get('data_type') == 'time_series':
+                    _ts_values[_key] = att['values']
+                else:
+                    raise Exception("Unexpected dictionary {}".format(att))
+            else:
+                _constants[_key] = att
+
         def init_rule(m, *key):
             ## last key is time
             pm_t = key[-1]
             key = key[:-1]
-            if len(key) == 0:
-                return get_time_attr(_data, pm_t)
             if len(key) == 1:
                 key = key[0]
-            if key in _data:
-                return get_time_attr(_data[key], pm_t)
-            else:
-                return None
-
-        def get_time_attr(att, pm_t):
-            if isinstance(att, dict):
-                if 'data_type' in att and att['data_type'] == 'time_series':
-                    return att['values'][md_timeperiods[pm_t-1]]
-                else:
-                    raise Exception("Unexpected dictionary {}".format(att))
-            else:
-                return att
+            if key in _ts_values:
+                return _ts_values[key][_tp_by_pmt[pm_t]]
+            if key in _constants:
+                return _constants[key]
+            return None
 
         return init_rule
     return uc_time_helper
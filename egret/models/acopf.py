@@ -22,7 +22,7 @@ import egret.model_library.transmission.gen as libgen
 
 from egret.model_library.defn import FlowType, CoordinateType
 from egret.data.model_data import map_items, zip_items
-from math import pi, radians
+from math import cos, sin, pi, radians
 
 
 def _include_feasibility_slack(model, bus_attrs, gen_attrs, bus_p_loads, bus_q_loads, penalty=1000):
@@ -120,8 +120,8 @@ def create_psv_acopf_model(model_data, include_feasibility_slack=False):
                           )
 
     ### declare the current flows in the branches
-    vr_init = {k: bus_attrs['vm'][k] * pe.cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
-    vj_init = {k: bus_attrs['vm'][k] * pe.sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
+    vr_init = {k: bus_attrs['vm'][k] * cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
+    vj_init = {k: bus_attrs['vm'][k] * sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
     s_max = {k: branches[k]['rating_long_term'] for k in branches.keys()}
     s_lbub = dict()
     for k in branches.keys():
@@ -281,12 +281,12 @@ def create_rsv_acopf_model(model_data, include_feasibility_slack=False):
 
     ### declare the rectangular voltages
     neg_v_max = map_items(op.neg, bus_attrs['v_max'])
-    vr_init = {k: bus_attrs['vm'][k] * pe.cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
+    vr_init = {k: bus_attrs['vm'][k] * cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
     libbus.declare_var_vr(model, bus_attrs['names'], initialize=vr_init,
                           bounds=zip_items(neg_v_max, bus_attrs['v_max'])
                           )
 
-    vj_init = {k: bus_attrs['vm'][k] * pe.sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
+    vj_init = {k: bus_attrs['vm'][k] * sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
     libbus.declare_var_vj(model, bus_attrs['names'], initialize=vj_init,
                           bounds=zip_items(neg_v_max, bus_attrs['v_max'])
                           )
@@ -477,12 +477,12 @@ def create_riv_acopf_model(model_data, include_feasibility_slack=False):
 
     ### declare the rectangular voltages
     neg_v_max = map_items(op.neg, bus_attrs['v_max'])
-    vr_init = {k: bus_attrs['vm'][k] * pe.cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
+    vr_init = {k: bus_attrs['vm'][k] * cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
     libbus.declare_var_vr(model, bus_attrs['names'], initialize=vr_init,
                           bounds=zip_items(neg_v_max, bus_attrs['v_max'])
                           )
 
-    vj_init = {k: bus_attrs['vm'][k] * pe.sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
+    vj_init = {k: bus_attrs['vm'][k] * sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
     libbus.declare_var_vj(model, bus_attrs['names'], initialize=vj_init,
                           bounds=zip_items(neg_v_max, bus_attrs['v_max'])
                           )
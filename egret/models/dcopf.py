@@ -75,9 +75,8 @@ def create_btheta_dcopf_model(model_data, include_angle_diff_limits=False, inclu
     _, bus_gs_fixed_shunts = tx_utils.dict_of_bus_fixed_shunts(buses, shunts)
 
     ### declare the polar voltages
-    va_bounds = {k: (-pi, pi) for k in bus_attrs['va']}
     libbus.declare_var_va(model, bus_attrs['names'], initialize=bus_attrs['va'],
-                          bounds=va_bounds
+                          bounds=(-pi, pi)
                           )
 
     ### include the feasibility slack for the bus balances
@@ -98,21 +97,10 @@ def create_btheta_dcopf_model(model_data, include_angle_diff_limits=False, inclu
                           )
 
     ### declare the current flows in the branches
-    vr_init = {k: bus_attrs['vm'][k] * pe.cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
-    vj_init = {k: bus_attrs['vm'][k] * pe.sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
     p_max = {k: branches[k]['rating_long_term'] for k in branches.keys()}
     p_lbub = {k: (-p_max[k],p_max[k]) for k in branches.keys()}
     pf_bounds = p_lbub
-    pf_init = dict()
-    for branch_name, branch in branches.items():
-        from_bus = branch['from_bus']
-        to_bus = branch['to_bus']
-        y_matrix = tx_calc.calculate_y_matrix_from_branch(branch)
-        ifr_init = tx_calc.calculate_ifr(vr_init[from_bus], vj_init[from_bus], vr_init[to_bus],
-                                         vj_init[to_bus], y_matrix)
-        ifj_init = tx_calc.calculate_ifj(vr_init[from_bus], vj_init[from_bus], vr_init[to_bus],
-                                         vj_init[to_bus], y_matrix)
-        pf_init[branch_name] = tx_calc.calculate_p(ifr_init, ifj_init, vr_init[from_bus], vj_init[from_bus])
+    pf_init = tx_calc.calculate_pf_init(branches, branch_attrs, bus_attrs)
 
     libbranch.declare_var_pf(model=model,
                              index_set=branch_attrs['names'],
@@ -160,7 +148,7 @@ def create_btheta_dcopf_model(model_data, include_angle_diff_limits=False, inclu
                                                   p_costs=gen_attrs['p_cost']
                                                   )
 
-    obj_expr = sum(model.pg_operating_cost[gen_name] for gen_name in model.pg_operating_cost)
+    obj_expr = pe.quicksum(model.pg_operating_cost[gen_name] for gen_name in model.pg_operating_cost)
     if include_feasibility_slack:
         obj_expr += penalty_expr
 
@@ -184,8 +172,6 @@ def create_ptdf_dcopf_model(model_data, include_feasibility_slack=False,base_poi
     gen_attrs = md.attributes(element_type='generator')
     bus_attrs = md.attributes(element_type='bus')
     branch_attrs = md.attributes(element_type='branch')
-    load_attrs = md.attributes(element_type='load')
-    shunt_attrs = md.attributes(element_type='shunt')
 
     inlet_branches_by_bus, outlet_branches_by_bus = \
         tx_utils.inlet_outlet_branches_by_bus(branches, buses)
@@ -214,21 +200,10 @@ def create_ptdf_dcopf_model(model_data, include_feasibility_slack=False,base_poi
         p_rhs_kwargs, penalty_expr = _include_system_feasibility_slack(model, gen_attrs, bus_p_loads)
 
     ### declare the current flows in the branches
-    vr_init = {k: bus_attrs['vm'][k] * pe.cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
-    vj_init = {k: bus_attrs['vm'][k] * pe.sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
     p_max = {k: branches[k]['rating_long_term'] for k in branches.keys()}
     p_lbub = {k: (-p_max[k],p_max[k]) for k in branches.keys()}
     pf_bounds = p_lbub
-    pf_init = dict()
-    for branch_name, branch in branches.items():
-        from_bus = branch['from_bus']
-        to_bus = branch['to_bus']
-        y_matrix = tx_calc.calculate_y_matrix_from_branch(branch)
-        ifr_init = tx_calc.calculate_ifr(vr_init[from_bus], vj_init[from_bus], vr_init[to_bus],
-                                         vj_init[to_bus], y_matrix)
-        ifj_init = tx_calc.calculate_ifj(vr_init[from_bus], vj_init[from_bus], vr_init[to_bus],
-                                         vj_init[to_bus], y_matrix)
-        pf_init[branch_name] = tx_calc.calculate_p(ifr_init, ifj_init, vr_init[from_bus], vj_init[from_bus])
+    pf_init = tx_calc.calculate_pf_init(branches, branch_attrs, bus_attrs)
 
     libbranch.declare_var_pf(model=model,
                              index_set=branch_attrs['names'],
@@ -269,7 +244,7 @@ def create_ptdf_dcopf_model(model_data, include_feasibility_slack=False,base_poi
                                                   p_costs=gen_attrs['p_cost']
                                                   )
 
-    obj_expr = sum(model.pg_operating_cost[gen_name] for gen_name in model.pg_operating_cost)
+    obj_expr = pe.quicksum(model.pg_operating_cost[gen_name] for gen_name in model.pg_operating_cost)
     if include_feasibility_slack:
         obj_expr += penalty_expr
 
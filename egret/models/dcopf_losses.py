@@ -31,22 +31,37 @@ from egret.models.dcopf import _include_feasibility_slack
 from math import pi, radians
 
 
-def create_btheta_losses_dcopf_model(model_data, relaxation_type=RelaxationType.SOC, include_angle_diff_limits=False, include_feasibility_slack=False):
-    md = model_data.clone_in_service()
-    tx_utils.scale_ModelData_to_pu(md, inplace = True)
-
-    gens = dict(md.elements(element_type='generator'))
-    buses = dict(md.elements(element_type='bus'))
-    branches = dict(md.elements(element_type='branch'))
+def _elems_and_attrs(md, element_type):
+    """
+    Return the element dict and the attribute view (as built by
+    md.attributes) for element_type in a single traversal of the
+    ModelData, rather than walking the data once per call.
+    """
+    elems = dict(md.elements(element_type=element_type))
+    attrs = {'names': list(elems.keys())}
+    for name, elem in elems.items():
+        for attrib, value in elem.items():
+            if attrib not in attrs:
+                attrs[attrib] = dict()
+            attrs[attrib][name] = value
+    return elems, attrs
+
+
+def create_btheta_losses_dcopf_model(model_data, relaxation_type=RelaxationType.SOC, include_angle_diff_limits=False, include_feasibility_slack=False, skip_initialize=False, _already_cloned=False):
+    ## callers that have already taken an in-service clone scaled to
+    ## per-unit can pass _already_cloned=True to skip the deep copy
+    if _already_cloned:
+        md = model_data
+    else:
+        md = model_data.clone_in_service()
+        tx_utils.scale_ModelData_to_pu(md, inplace = True)
+
+    gens, gen_attrs = _elems_and_attrs(md, 'generator')
+    buses, bus_attrs = _elems_and_attrs(md, 'bus')
+    branches, branch_attrs = _elems_and_attrs(md, 'branch')
     loads = dict(md.elements(element_type='load'))
     shunts = dict(md.elements(element_type='shunt'))
 
-    gen_attrs = md.attributes(element_type='generator')
-    bus_attrs = md.attributes(element_type='bus')
-    branch_attrs = md.attributes(element_type='branch')
-    load_attrs = md.attributes(element_type='load')
-    shunt_attrs = md.attributes(element_type='shunt')
-
     inlet_branches_by_bus, outlet_branches_by_bus = \
         tx_utils.inlet_outlet_branches_by_bus(branches, buses)
     gens_by_bus = tx_utils.gens_by_bus(buses, gens)
@@ -63,14 +78,12 @@ def create_btheta_losses_dcopf_model(model_data, relaxation_type=RelaxationType.
     _, bus_gs_fixed_shunts = tx_utils.dict_of_bus_fixed_shunts(buses, shunts)
 
     ### declare the polar voltages
-    va_bounds = {k: (-pi, pi) for k in bus_attrs['va']}
     libbus.declare_var_va(model, bus_attrs['names'], initialize=bus_attrs['va'],
-                          bounds=va_bounds
+                          bounds=(-pi, pi)
                           )
 
-    dva_initialize = {k: 0.0 for k in branch_attrs['names']}
     libbranch.declare_var_dva(model, branch_attrs['names'],
-                              initialize=dva_initialize
+                              initialize=0.0
                               )
 
     ### include the feasibility slack for the bus balances
@@ -91,22 +104,16 @@ def create_btheta_losses_dcopf_model(model_data, relaxation_type=RelaxationType.
                           )
 
     ### declare the current flows in the branches
-    vr_init = {k: bus_attrs['vm'][k] * pe.cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
-    vj_init = {k: bus_attrs['vm'][k] * pe.sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
-    p_max = {k: branches[k]['rating_long_term'] for k in branches.keys()}
-    pf_bounds = {k: (-p_max[k],p_max[k]) for k in branches.keys()}
-    pf_init = dict()
-    for branch_name, branch in branches.items():
-        from_bus = branch['from_bus']
-        to_bus = branch['to_bus']
-        y_matrix = tx_calc.calculate_y_matrix_from_branch(branch)
-        ifr_init = tx_calc.calculate_ifr(vr_init[from_bus], vj_init[from_bus], vr_init[to_bus],
-                                         vj_init[to_bus], y_matrix)
-        ifj_init = tx_calc.calculate_ifj(vr_init[from_bus], vj_init[from_bus], vr_init[to_bus],
-                                         vj_init[to_bus], y_matrix)
-        pf_init[branch_name] = tx_calc.calculate_p(ifr_init, ifj_init, vr_init[from_bus], vj_init[from_bus])
-    pfl_bounds = {k: (0,p_max[k]**2) for k in branches.keys()}
-    pfl_init = {k: 0 for k in branches.keys()}
+    p_max = {k: branches[k]['rating_long_term'] for k in branch_attrs['names']}
+    pf_bounds = {k: (-v,v) for k, v in p_max.items()}
+    ## interior-point LP/QP solvers ignore the initial point, so the
+    ## flow initialization can be skipped entirely
+    if skip_initialize:
+        pf_init = 0.
+    else:
+        pf_init = tx_calc.calculate_pf_init(branches, branch_attrs, bus_attrs)
+    pfl_bounds = {k: (0,v**2) for k, v in p_max.items()}
+    pfl_init = 0.
 
     libbranch.declare_var_pf(model=model,
                              index_set=branch_attrs['names'],
@@ -174,7 +181,7 @@ def create_btheta_losses_dcopf_model(model_data, relaxation_type=RelaxationType.
                                                   p_costs=gen_attrs['p_cost']
                                                   )
 
-    obj_expr = sum(model.pg_operating_cost[gen_name] for gen_name in model.pg_operating_cost)
+    obj_expr = pe.quicksum(model.pg_operating_cost[gen_name] for gen_name in model.pg_operating_cost)
     if include_feasibility_slack:
         obj_expr += penalty_expr
 
@@ -183,24 +190,23 @@ def create_btheta_losses_dcopf_model(model_data, relaxation_type=RelaxationType.
     return model, md
 
 
-def create_ptdf_losses_dcopf_model(model_data, include_feasibility_slack=False):
-    md = model_data.clone_in_service()
-    tx_utils.scale_ModelData_to_pu(md, inplace = True)
+def create_ptdf_losses_dcopf_model(model_data, include_feasibility_slack=False, ptdf_rel_tol=None, ldf_rel_tol=None, skip_initialize=False, _already_cloned=False):
+    ## callers that have already taken an in-service clone scaled to
+    ## per-unit can pass _already_cloned=True to skip the deep copy
+    if _already_cloned:
+        md = model_data
+    else:
+        md = model_data.clone_in_service()
+        tx_utils.scale_ModelData_to_pu(md, inplace = True)
 
     data_utils.create_dicts_of_ptdf_losses(md)
 
-    gens = dict(md.elements(element_type='generator'))
-    buses = dict(md.elements(element_type='bus'))
-    branches = dict(md.elements(element_type='branch'))
+    gens, gen_attrs = _elems_and_attrs(md, 'generator')
+    buses, bus_attrs = _elems_and_attrs(md, 'bus')
+    branches, branch_attrs = _elems_and_attrs(md, 'branch')
     loads = dict(md.elements(element_type='load'))
     shunts = dict(md.elements(element_type='shunt'))
 
-    gen_attrs = md.attributes(element_type='generator')
-    bus_attrs = md.attributes(element_type='bus')
-    branch_attrs = md.attributes(element_type='branch')
-    load_attrs = md.attributes(element_type='load')
-    shunt_attrs = md.attributes(element_type='shunt')
-
     inlet_branches_by_bus, outlet_branches_by_bus = \
         tx_utils.inlet_outlet_branches_by_bus(branches, buses)
     gens_by_bus = tx_utils.gens_by_bus(buses, gens)
@@ -228,22 +234,16 @@ def create_ptdf_losses_dcopf_model(model_data, include_feasibility_slack=False):
         p_rhs_kwargs, penalty_expr = _include_system_feasibility_slack(model, gen_attrs, bus_p_loads)
 
     ### declare the current flows in the branches
-    vr_init = {k: bus_attrs['vm'][k] * pe.cos(bus_attrs['va'][k]) for k in bus_attrs['vm']}
-    vj_init = {k: bus_attrs['vm'][k] * pe.sin(bus_attrs['va'][k]) for k in bus_attrs['vm']}
-    p_max = {k: branches[k]['rating_long_term'] for k in branches.keys()}
-    pf_bounds = {k: (-p_max[k],p_max[k]) for k in branches.keys()}
-    pf_init = dict()
-    for branch_name, branch in branches.items():
-        from_bus = branch['from_bus']
-        to_bus = branch['to_bus']
-        y_matrix = tx_calc.calculate_y_matrix_from_branch(branch)
-        ifr_init = tx_calc.calculate_ifr(vr_init[from_bus], vj_init[from_bus], vr_init[to_bus],
-                                         vj_init[to_bus], y_matrix)
-        ifj_init = tx_calc.calculate_ifj(vr_init[from_bus], vj_init[from_bus], vr_init[to_bus],
-                                         vj_init[to_bus], y_matrix)
-        pf_init[branch_name] = tx_calc.calculate_p(ifr_init, ifj_init, vr_init[from_bus], vj_init[from_bus])
-    pfl_bounds = {k: (-p_max[k]**2,p_max[k]**2) for k in branches.keys()}
-    pfl_init = {k: 0 for k in branches.keys()}
+    p_max = {k: branches[k]['rating_long_term'] for k in branch_attrs['names']}
+    pf_bounds = {k: (-v,v) for k, v in p_max.items()}
+    ## interior-point LP/QP solvers ignore the initial point, so the
+    ## flow initialization can be skipped entirely
+    if skip_initialize:
+        pf_init = 0.
+    else:
+        pf_init = tx_calc.calculate_pf_init(branches, branch_attrs, bus_attrs)
+    pfl_bounds = {k: (-v**2,v**2) for k, v in p_max.items()}
+    pfl_init = 0.
 
     libbranch.declare_var_pf(model=model,
                              index_set=branch_attrs['names'],
@@ -257,26 +257,17 @@ def create_ptdf_losses_dcopf_model(model_data, include_feasibility_slack=False):
                               bounds=pfl_bounds
                              )
 
-    ### declare the branch power flow approximation constraints
-    libbranch.declare_eq_branch_power_ptdf_approx(model=model,
-                                                  index_set=branch_attrs['names'],
-                                                  branches=branches,
-                                                  buses=buses,
-                                                  bus_p_loads=bus_p_loads,
-                                                  gens_by_bus=gens_by_bus,
-                                                  bus_gs_fixed_shunts=bus_gs_fixed_shunts,
-                                                  approximation_type=ApproximationType.PTDF_LOSSES
-                                                  )
-
-    ### declare the branch power loss approximation constraints
-    libbranch.declare_eq_branch_loss_ptdf_approx(model=model,
-                                                  index_set=branch_attrs['names'],
-                                                  branches=branches,
-                                                  buses=buses,
-                                                  bus_p_loads=bus_p_loads,
-                                                  gens_by_bus=gens_by_bus,
-                                                  bus_gs_fixed_shunts=bus_gs_fixed_shunts
-                                                  )
+    ### declare the branch power flow and loss approximation constraints
+    libbranch.declare_eq_branch_power_loss_ptdf_approx(model=model,
+                                                       index_set=branch_attrs['names'],
+                                                       branches=branches,
+                                                       buses=buses,
+                                                       bus_p_loads=bus_p_loads,
+                                                       gens_by_bus=gens_by_bus,
+                                                       bus_gs_fixed_shunts=bus_gs_fixed_shunts,
+                                                       ptdf_rel_tol=ptdf_rel_tol,
+                                                       ldf_rel_tol=ldf_rel_tol
+                                                       )
 
     ### declare the p balance
     libbus.declare_eq_p_balance_ed(model=model,
@@ -302,7 +293,7 @@ def create_ptdf_losses_dcopf_model(model_data, include_feasibility_slack=False):
                                                   p_costs=gen_attrs['p_cost']
                                                   )
 
-    obj_expr = sum(model.pg_operating_cost[gen_name] for gen_name in model.pg_operating_cost)
+    obj_expr = pe.quicksum(model.pg_operating_cost[gen_name] for gen_name in model.pg_operating_cost)
     if include_feasibility_slack:
         obj_expr += penalty_expr
 
@@ -349,6 +340,7 @@ def solve_dcopf_losses(model_data,
         Additional arguments for building model
     '''
 
+    import numpy as np
     import pyomo.environ as pe
     from pyomo.environ import value
     from egret.common.solver_interface import _solve_model
@@ -369,23 +361,52 @@ def solve_dcopf_losses(model_data,
 
     md.data['system']['total_cost'] = value(m.obj)
 
+    ## _solve_model loads the solution, so variable values can be read
+    ## off the .value attribute directly; pyomo's value() re-dispatches
+    ## through the expression system per call. Suffix entries are
+    ## already plain floats.
+    ## bind the components to locals once; m.<component> resolves
+    ## through the block's __getattr__ on every access inside the loops
+    m_pg = m.pg
+    m_pl = m.pl
+    m_pf = m.pf
+    m_dual = m.dual
+
     for g,g_dict in gens.items():
-        g_dict['pg'] = value(m.pg[g])
+        g_dict['pg'] = m_pg[g].value
 
+    _is_btheta = dcopf_losses_model_generator == create_btheta_losses_dcopf_model
+    if _is_btheta:
+        m_va = m.va
+        m_eq_p_balance = m.eq_p_balance
     for b,b_dict in buses.items():
-        b_dict['pl'] = value(m.pl[b])
+        b_dict['pl'] = m_pl[b].value
         b_dict.pop('qlmp',None)
-        if dcopf_losses_model_generator == create_btheta_losses_dcopf_model:
-            b_dict['lmp'] = value(m.dual[m.eq_p_balance[b]])
-            b_dict['va'] = value(m.va[b])
-        if dcopf_losses_model_generator == create_ptdf_losses_dcopf_model:
-            b_dict['lmp'] = value(m.dual[m.eq_p_balance])
-            for k, k_dict in branches.items():
-                b_dict['lmp'] += k_dict['ptdf_r'][b]*value(m.dual[m.eq_pf_branch[k]])
-                b_dict['lmp'] += k_dict['ldf'][b]*value(m.dual[m.eq_pfl_branch[k]])
+        if _is_btheta:
+            b_dict['lmp'] = m_dual[m_eq_p_balance[b]]
+            b_dict['va'] = m_va[b].value
+
+    if dcopf_losses_model_generator == create_ptdf_losses_dcopf_model:
+        ## the LMP at every bus is the balance dual plus the dual-
+        ## weighted ptdf_r and ldf columns; compute it as two
+        ## matrix-vector products instead of a bus-by-branch loop
+        bus_names = list(buses.keys())
+        branch_names = list(branches.keys())
+        _len_branch = len(branch_names)
+        m_eq_pf_branch = m.eq_pf_branch
+        m_eq_pfl_branch = m.eq_pfl_branch
+        mu_pf = np.fromiter((m_dual[m_eq_pf_branch[k]] for k in branch_names),
+                            float, count=_len_branch)
+        mu_pfl = np.fromiter((m_dual[m_eq_pfl_branch[k]] for k in branch_names),
+                             float, count=_len_branch)
+        ptdf_mat = np.array([[branches[k]['ptdf_r'][b] for b in bus_names] for k in branch_names])
+        ldf_mat = np.array([[branches[k]['ldf'][b] for b in bus_names] for k in branch_names])
+        lmp = m_dual[m.eq_p_balance] + ptdf_mat.T.dot(mu_pf) + ldf_mat.T.dot(mu_pfl)
+        for b, b_lmp in zip(bus_names, lmp.tolist()):
+            buses[b]['lmp'] = b_lmp
 
     for k, k_dict in branches.items():
-        k_dict['pf'] = value(m.pf[k])
+        k_dict['pf'] = m_pf[k].value
 
     unscale_ModelData_to_pu(md, inplace=True)
 
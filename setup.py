@@ -26,7 +26,7 @@ setuptools_kwargs = {
     'install_requires': [],
     'scripts': [],
     'include_package_data': True,
-    'install_requires' : ['pyomo>=5.6', 'numpy', 'pytest', 'pandas', 'matplotlib', 'seaborn']
+    'install_requires' : ['pyomo>=5.6', 'numpy', 'scipy', 'pytest', 'pandas', 'matplotlib', 'seaborn']
 }
 
 setup(name=DISTNAME,